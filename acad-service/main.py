@@ -1,13 +1,28 @@
-from fastapi import FastAPI, HTTPException, Query, Header
+from fastapi import FastAPI, HTTPException, Query, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
-import psycopg2
-import requests
+import asyncpg
+import httpx
+import orjson
+import jwt
 import os
+import json
+import time
+import base64
+import hashlib
+import asyncio
+import functools
+import re
+from collections import OrderedDict
 from datetime import datetime
-from contextlib import contextmanager
 
-app = FastAPI(title="Acad Service", version="1.0.0")
+app = FastAPI(
+    title="Acad Service",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 # CORS middleware
 app.add_middleware(
@@ -16,12 +31,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursor pagination /api/acad/mahasiswa harus bisa dibaca dari browser
+    expose_headers=["X-Next-After"],
 )
 
+# Kompresi response (mis. list mahasiswa) untuk client yang mengirim
+# Accept-Encoding: gzip; response kecil dibiarkan apa adanya
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=4)
+
 # Database configuration (sesuai docker-compose)
 DB_CONFIG = {
     "host": os.getenv("DB_HOST", "localhost"),
-    "port": os.getenv("DB_PORT", "5432"),
+    "port": int(os.getenv("DB_PORT", "5432")),
     "database": os.getenv("DB_NAME", "acad_db"),
     "user": os.getenv("DB_USER", "acad_user"),
     "password": os.getenv("DB_PASSWORD", "acad_pass"),
@@ -33,43 +54,206 @@ class Mahasiswa(BaseModel):
     jurusan: str
     angkatan: int = Field(ge=0)
 
-@contextmanager
-def get_db_connection():
-    conn = psycopg2.connect(**DB_CONFIG)
-    try:
-        yield conn
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+# Ukuran connection pool PostgreSQL
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+# Set 0 jika lewat PgBouncer (transaction mode), karena prepared statement
+# server-side tidak bertahan antar transaksi
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+class AcadConnection(asyncpg.Connection):
+    """Koneksi pool yang menyimpan prepared statement untuk query utama."""
+
+    stmt_mahasiswa = None
+    stmt_ips = None
+
+async def prepare_statements(conn: AcadConnection):
+    # Lewat PgBouncer (transaction mode) prepared statement tidak bisa
+    # dipakai ulang, jadi handler memakai query biasa
+    if DB_STATEMENT_CACHE_SIZE == 0:
+        return
+    conn.stmt_mahasiswa = await conn.prepare(MAHASISWA_LIST_QUERY)
+    conn.stmt_ips = await conn.prepare(IPS_QUERY)
+
+# Percobaan ulang koneksi awal: PostgreSQL/PgBouncer bisa belum siap saat
+# container acad-service sudah jalan (depends_on tidak menunggu DB siap)
+DB_CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", "10"))
+DB_CONNECT_BACKOFF_MAX = float(os.getenv("DB_CONNECT_BACKOFF_MAX", "10"))
+
+async def connect_with_retry(connect):
+    """Panggil `connect()` dengan exponential backoff; error terakhir diteruskan."""
+    delay = 0.5
+    for attempt in range(1, DB_CONNECT_RETRIES + 1):
+        try:
+            return await connect()
+        except (OSError, asyncpg.PostgresError, asyncio.TimeoutError) as e:
+            if attempt == DB_CONNECT_RETRIES:
+                raise
+            print(
+                f"Acad Service: PostgreSQL belum siap ({e}), "
+                f"coba lagi dalam {delay:.1f}s ({attempt}/{DB_CONNECT_RETRIES})"
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, DB_CONNECT_BACKOFF_MAX)
 
 @app.on_event("startup")
 async def startup_event():
-    try:
-        with get_db_connection() as conn:
-            print("Acad Service: Connected to PostgreSQL")
-    except Exception as e:
-        print(f"Acad Service: PostgreSQL connection error: {e}")
+    # Jika DB tetap tidak bisa dihubungi, exception diteruskan sehingga startup
+    # worker gagal; gunicorn lalu berhenti (worker failed to boot) dan
+    # restart policy container menjalankan service kembali
+    app.state.pool = await connect_with_retry(lambda: asyncpg.create_pool(
+        **DB_CONFIG,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        command_timeout=60,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        # Koneksi idle di-recycle agar tidak memakai koneksi yang sudah putus
+        max_inactive_connection_lifetime=300,
+        connection_class=AcadConnection,
+        init=prepare_statements,
+    ))
+    print("Acad Service: Connected to PostgreSQL")
+
+    # HTTP client bersama (keep-alive) untuk memanggil auth-service.
+    # Jika AUTH_VERIFY_UDS diisi, request dikirim lewat Unix domain socket;
+    # AUTH_VERIFY_URL tetap dipakai untuk path dan header Host.
+    limits = httpx.Limits(max_keepalive_connections=50, max_connections=100)
+    transport = None
+    if AUTH_VERIFY_UDS:
+        transport = httpx.AsyncHTTPTransport(uds=AUTH_VERIFY_UDS, limits=limits)
+    app.state.http = httpx.AsyncClient(
+        timeout=5.0,
+        limits=limits,
+        transport=transport,
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    pool = getattr(app.state, "pool", None)
+    if pool is not None:
+        await pool.close()
+
+    http = getattr(app.state, "http", None)
+    if http is not None:
+        await http.aclose()
 
 # URL ke auth-service untuk verifikasi JWT
 AUTH_VERIFY_URL = os.getenv(
     "AUTH_VERIFY_URL",
     "http://auth-service:3001/api/auth/verify",
 )
+# Path Unix domain socket auth-service jika berjalan di host/pod yang sama
+AUTH_VERIFY_UDS = os.getenv("AUTH_VERIFY_UDS")
 
-def verify_token_or_raise(authorization: str | None):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Token tidak diberikan")
+# Opsional: secret JWT yang sama dengan auth-service. Jika diisi, token
+# diverifikasi secara lokal tanpa memanggil auth-service (tanpa cache,
+# single-flight, maupun UDS). Karena HS256 simetris, service yang memegang
+# secret ini juga bisa membuat token; default-nya tidak diisi.
+JWT_SECRET = os.getenv("JWT_SECRET")
+JWT_ALGORITHMS = ["HS256"]
 
-    token = authorization.split(" ", 1)[1]
+class TTLCache:
+    """Cache LRU berukuran tetap dengan waktu kedaluwarsa per entri."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if time.time() >= expires_at:
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires_at: float):
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        # Buang entri yang paling lama tidak dipakai, O(1) per entri
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+_MISSING = object()
+
+# Cache hasil verifikasi token: sha256(token) -> user
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "120"))
+TOKEN_CACHE_MAXSIZE = int(os.getenv("TOKEN_CACHE_MAXSIZE", "10000"))
+_token_cache = TTLCache(TOKEN_CACHE_MAXSIZE)
+# Verifikasi yang sedang berjalan: sha256(token) -> task verifikasi bersama
+_inflight: dict[str, asyncio.Task] = {}
+
+_B64URL_RE = re.compile(r"[A-Za-z0-9_-]+")
 
+def _b64url_json(segment: str) -> dict:
+    segment += "=" * (-len(segment) % 4)
+    return json.loads(base64.urlsafe_b64decode(segment))
+
+def _is_wellformed_jwt(token: str) -> bool:
+    """Cek format JWT secara murah sebelum memanggil auth-service."""
+    # JWT selalu terdiri dari tiga segmen: header.payload.signature
+    if not (20 < len(token) < 4096 and token.count(".") == 2):
+        return False
+
+    header_b64 = token.split(".", 1)[0]
+    if not _B64URL_RE.fullmatch(header_b64):
+        return False
+    try:
+        header = _b64url_json(header_b64)
+    except Exception:
+        return False
+    return isinstance(header, dict) and "alg" in header
+
+def _token_exp(token: str) -> float | None:
+    """Ambil klaim `exp` dari payload JWT tanpa verifikasi signature."""
     try:
-        resp = requests.post(
+        exp = _b64url_json(token.split(".")[1]).get("exp")
+        return float(exp) if exp is not None else None
+    except Exception:
+        return None
+
+def _cache_token(key: str, token: str, user: dict | None):
+    now = time.time()
+    expires_at = now + TOKEN_CACHE_TTL
+    exp = _token_exp(token)
+    if exp is not None:
+        # Jangan pernah menyajikan token yang sudah kedaluwarsa dari cache
+        expires_at = min(expires_at, exp)
+    if expires_at <= now:
+        return
+
+    _token_cache.set(key, user, expires_at)
+
+def _discard_task_result(task: asyncio.Task):
+    # Ambil exception task yang hasilnya tidak dipakai agar asyncio tidak
+    # mencatat "Task exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+def _finish_inflight(key: str, task: asyncio.Task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    _discard_task_result(task)
+
+async def _verify_and_cache(key: str, token: str):
+    user = await _verify_with_auth_service(token)
+    _cache_token(key, token, user)
+    return user
+
+async def _verify_with_auth_service(token: str):
+    try:
+        resp = await app.state.http.post(
             AUTH_VERIFY_URL,
             headers={"Authorization": f"Bearer {token}"},
-            timeout=5,
         )
         if resp.status_code != 200:
             raise HTTPException(status_code=401, detail="Token tidak valid")
@@ -84,30 +268,147 @@ def verify_token_or_raise(authorization: str | None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Gagal verifikasi token: {e}")
 
+def _verify_locally(token: str) -> dict:
+    try:
+        payload = jwt.decode(
+            token,
+            JWT_SECRET,
+            algorithms=JWT_ALGORITHMS,
+            options={"require": ["exp"]},
+        )
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Token tidak valid")
+
+    return {"_id": payload.get("userId"), "username": payload.get("username")}
+
+async def verify_token_or_raise(authorization: str | None):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Token tidak diberikan")
+
+    token = authorization.split(" ", 1)[1]
+
+    if not _is_wellformed_jwt(token):
+        raise HTTPException(status_code=401, detail="Token tidak valid")
+
+    if JWT_SECRET:
+        return _verify_locally(token)
+
+    key = hashlib.sha256(token.encode()).hexdigest()
+    user = _token_cache.get(key, _MISSING)
+    if user is not _MISSING:
+        return user
+
+    # Semua request dengan token yang sama menunggu satu task verifikasi.
+    # Task tidak dimiliki request mana pun dan ditunggu lewat shield, jadi
+    # request yang dibatalkan (client putus) tidak membatalkan yang lain.
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_verify_and_cache(key, token))
+        _inflight[key] = task
+        task.add_done_callback(functools.partial(_finish_inflight, key))
+    return await asyncio.shield(task)
+
+# Body health check dihitung sekali saat modul dimuat
+_STARTED_AT = datetime.now().isoformat()
+_STARTED_MONOTONIC = time.monotonic()
+_HEALTH_BODY = orjson.dumps({
+    "status": "Acad Service is running",
+    "started_at": _STARTED_AT,
+})
+
 # Health check
 @app.get("/api/acad/health")
-async def health_check():
+async def health_check(uptime: bool = Query(False, description="Sertakan uptime_s")):
+    if not uptime:
+        return Response(_HEALTH_BODY, media_type="application/json")
     return {
         "status": "Acad Service is running",
-        "timestamp": datetime.now().isoformat(),
+        "started_at": _STARTED_AT,
+        "uptime_s": round(time.monotonic() - _STARTED_MONOTONIC, 3),
     }
 
-# List semua mahasiswa
+# Keyset pagination berdasarkan nim: $1 = nim terakhir halaman sebelumnya
+# (NULL untuk halaman pertama), $2 = jumlah baris per halaman.
+# last_nim menjadi cursor halaman berikutnya jika halaman ini penuh.
+MAHASISWA_LIST_QUERY = """
+    SELECT
+        COALESCE(json_agg(m ORDER BY m.nim), '[]'::json)::text AS body,
+        count(*) AS total,
+        max(m.nim) AS last_nim
+    FROM (
+        SELECT nim, nama, jurusan, angkatan
+        FROM mahasiswa
+        WHERE ($1::text IS NULL OR nim > $1::text)
+        ORDER BY nim
+        LIMIT $2
+    ) m
+"""
+
+# List mahasiswa (urut nim, per halaman)
 @app.get("/api/acad/mahasiswa")
-async def get_mahasiswas():
+async def get_mahasiswas(
+    limit: int = Query(1000, ge=1, le=10000, description="Jumlah mahasiswa per halaman"),
+    after: str | None = Query(None, description="Ambil mahasiswa dengan nim setelah nilai ini"),
+):
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            query = "SELECT nim, nama, jurusan, angkatan FROM mahasiswa"
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            return [
-                {"nim": row[0], "nama": row[1], "jurusan": row[2], "angkatan": row[3]}
-                for row in rows
-            ]
+        # JSON array dibangun langsung oleh PostgreSQL
+        async with app.state.pool.acquire() as conn:
+            if conn.stmt_mahasiswa is not None:
+                page = await conn.stmt_mahasiswa.fetchrow(after, limit)
+            else:
+                page = await conn.fetchrow(MAHASISWA_LIST_QUERY, after, limit)
+
+        # Halaman penuh berarti mungkin masih ada data: kirim cursor berikutnya
+        headers = {}
+        if page["total"] == limit:
+            headers["X-Next-After"] = page["last_nim"]
+        return Response(page["body"], media_type="application/json", headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Cek mahasiswa + hitung IPS = SUM(sks * bobot) / SUM(sks) dalam satu round-trip.
+# Lookup PK mahasiswa, lalu agregasi krs via LATERAL memakai idx_krs_nim_semester.
+# Tidak ada baris -> mahasiswa tidak ada; total_sks NULL -> tidak ada KRS.
+IPS_QUERY = """
+    SELECT m.nim, m.nama, a.total_sks, a.ips
+    FROM mahasiswa m
+    LEFT JOIN LATERAL (
+        SELECT
+            SUM(mk.sks) AS total_sks,
+            ROUND(SUM(mk.sks * b.bobot)::numeric / NULLIF(SUM(mk.sks), 0), 2) AS ips
+        FROM krs k
+        JOIN mata_kuliah mk ON k.kode_mk = mk.kode_mk
+        JOIN bobot_nilai b ON k.nilai = b.nilai
+        WHERE k.nim = m.nim AND k.semester = $2
+    ) a ON TRUE
+    WHERE m.nim = $1
+"""
+
+# Negative cache untuk respons 404 /ips agar NIM yang tidak ada tidak terus
+# memukul DB: (nim,) -> mahasiswa tidak ada, (nim, semester) -> tidak ada KRS.
+# Nilai: detail 404. Bersihkan jika kelak ada endpoint tulis.
+NOT_FOUND_CACHE_TTL = int(os.getenv("NOT_FOUND_CACHE_TTL", "60"))
+NOT_FOUND_CACHE_MAXSIZE = int(os.getenv("NOT_FOUND_CACHE_MAXSIZE", "10000"))
+_not_found_cache = TTLCache(NOT_FOUND_CACHE_MAXSIZE)
+
+MAHASISWA_NOT_FOUND = "Mahasiswa tidak ditemukan"
+KRS_NOT_FOUND = "Tidak ada data KRS untuk mahasiswa dan semester tersebut"
+
+def _get_not_found(nim: str, semester: int) -> str | None:
+    detail = _not_found_cache.get((nim,))
+    if detail is None:
+        detail = _not_found_cache.get((nim, semester))
+    return detail
+
+def _cache_not_found(key: tuple, detail: str):
+    _not_found_cache.set(key, detail, time.time() + NOT_FOUND_CACHE_TTL)
+
+async def fetch_ips_row(nim: str, semester: int):
+    async with app.state.pool.acquire() as conn:
+        if conn.stmt_ips is not None:
+            return await conn.stmt_ips.fetchrow(nim, semester)
+        return await conn.fetchrow(IPS_QUERY, nim, semester)
+
 # Hitung IPS per mahasiswa per semester (protected dengan JWT)
 @app.get("/api/acad/ips/{nim}")
 async def get_ips(
@@ -121,54 +422,46 @@ async def get_ips(
     - mata_kuliah
     - bobot_nilai
     """
-    # Verifikasi token dulu
-    user = verify_token_or_raise(authorization)
+    # 404 yang baru saja terjadi dilayani dari cache, tetap setelah verifikasi token
+    not_found = _get_not_found(nim, semester)
+    if not_found is not None:
+        await verify_token_or_raise(authorization)
+        raise HTTPException(status_code=404, detail=not_found)
 
+    # Query DB berjalan bersamaan dengan verifikasi token ke auth-service.
+    # Token yang ditolak tanpa I/O (cek format, verifikasi lokal) gagal
+    # sebelum task DB mulai; token yang ditolak oleh auth-service tetap
+    # sempat menjalankan query, lalu hasilnya dibuang.
+    row_task = asyncio.create_task(fetch_ips_row(nim, semester))
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
+        user = await verify_token_or_raise(authorization)
+    except BaseException:
+        row_task.cancel()
+        row_task.add_done_callback(_discard_task_result)
+        raise
 
-            # Pastikan mahasiswa ada
-            cursor.execute(
-                "SELECT nim, nama FROM mahasiswa WHERE nim = %s",
-                (nim,),
-            )
-            mhs = cursor.fetchone()
-            if mhs is None:
-                raise HTTPException(status_code=404, detail="Mahasiswa tidak ditemukan")
-
-            # Hitung IPS: SUM(sks * bobot) / SUM(sks)
-            query = """
-                SELECT
-                    SUM(mk.sks * b.bobot) AS total_bobot,
-                    SUM(mk.sks) AS total_sks
-                FROM krs k
-                JOIN mata_kuliah mk ON k.kode_mk = mk.kode_mk
-                JOIN bobot_nilai b ON k.nilai = b.nilai
-                WHERE k.nim = %s AND k.semester = %s
-            """
-            cursor.execute(query, (nim, semester))
-            result = cursor.fetchone()
-
-            total_bobot = result[0]
-            total_sks = result[1]
-
-            if total_sks is None or total_sks == 0:
-                raise HTTPException(
-                    status_code=404,
-                    detail="Tidak ada data KRS untuk mahasiswa dan semester tersebut",
-                )
-
-            ips = float(total_bobot) / float(total_sks)
-
-            return {
-                "nim": nim,
-                "nama": mhs[1],
-                "semester": semester,
-                "total_sks": total_sks,
-                "ips": round(ips, 2),
-                "requested_by": user.get("username") if user else None,
-            }
+    try:
+        row = await row_task
+
+        if row is None:
+            _cache_not_found((nim,), MAHASISWA_NOT_FOUND)
+            raise HTTPException(status_code=404, detail=MAHASISWA_NOT_FOUND)
+
+        total_sks = row["total_sks"]
+        ips = row["ips"]
+
+        if total_sks is None or ips is None:
+            _cache_not_found((nim, semester), KRS_NOT_FOUND)
+            raise HTTPException(status_code=404, detail=KRS_NOT_FOUND)
+
+        return {
+            "nim": nim,
+            "nama": row["nama"],
+            "semester": semester,
+            "total_sks": total_sks,
+            "ips": float(ips),
+            "requested_by": user.get("username") if user else None,
+        }
 
     except HTTPException:
         raise
@@ -0,0 +1,56 @@
+"""
+Jalankan migrasi SQL di folder migrations satu kali (job one-shot di
+docker-compose), bukan di startup setiap worker uvicorn.
+
+Setiap file berisi tepat satu statement dan dikirim apa adanya, karena
+CREATE INDEX CONCURRENTLY tidak boleh berada dalam satu transaksi dengan
+statement lain. Semua file harus idempotent (IF NOT EXISTS).
+"""
+import asyncio
+from pathlib import Path
+
+import asyncpg
+
+from main import DB_CONFIG, connect_with_retry
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# Index yang dibuat oleh file migrasi; perbarui saat menambah migrasi index
+MIGRATION_INDEXES = [
+    "idx_krs_nim_semester",  # 001_krs_indexes.sql
+]
+
+# Index yang gagal dibangun secara CONCURRENTLY tertinggal dalam keadaan
+# INVALID dan akan dilewati oleh IF NOT EXISTS, jadi di-drop dulu. Hanya
+# index milik migrasi yang disentuh: index lain yang sedang dibangun juga
+# berstatus INVALID sampai selesai.
+INVALID_INDEXES_QUERY = """
+    SELECT quote_ident(n.nspname) || '.' || quote_ident(c.relname)
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE NOT i.indisvalid
+      AND n.nspname = current_schema()
+      AND c.relname = ANY($1::text[])
+"""
+
+async def drop_invalid_indexes(conn: asyncpg.Connection):
+    for (name,) in await conn.fetch(INVALID_INDEXES_QUERY, MIGRATION_INDEXES):
+        print(f"Acad Service: Drop invalid index {name}")
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+async def run_migrations():
+    # Tanpa command_timeout: pembuatan index di tabel besar bisa lama
+    conn = await connect_with_retry(
+        lambda: asyncpg.connect(**DB_CONFIG, command_timeout=None)
+    )
+    try:
+        await drop_invalid_indexes(conn)
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            await conn.execute(path.read_text())
+            print(f"Acad Service: Migration {path.name} applied")
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(run_migrations())
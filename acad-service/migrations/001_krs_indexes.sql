@@ -0,0 +1,7 @@
+-- Index untuk query IPS: filter krs (nim, semester), lalu join ke
+-- mata_kuliah (kode_mk) dan bobot_nilai (nilai). Kolom join ikut di-INCLUDE
+-- agar krs cukup dibaca lewat index-only scan.
+-- mahasiswa(nim), mata_kuliah(kode_mk), dan bobot_nilai(nilai) sudah
+-- ter-index lewat PRIMARY KEY.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_krs_nim_semester
+    ON krs (nim, semester) INCLUDE (kode_mk, nilai);
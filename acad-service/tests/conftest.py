@@ -0,0 +1,68 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import jwt
+import pytest
+
+# main.py berada di root acad-service, bukan di dalam package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    monkeypatch.setattr(main, "JWT_SECRET", None)
+    main._token_cache.clear()
+    main._inflight.clear()
+    main._not_found_cache.clear()
+    yield
+    main._token_cache.clear()
+    main._inflight.clear()
+    main._not_found_cache.clear()
+
+
+@pytest.fixture
+def make_token():
+    def make(exp: float | None = None, username: str = "budi", secret: str = "test-secret") -> str:
+        payload = {"userId": "u1", "username": username}
+        if exp is not None:
+            payload["exp"] = int(exp)
+        return jwt.encode(payload, secret, algorithm="HS256")
+    return make
+
+
+@pytest.fixture
+def valid_token(make_token):
+    return make_token(exp=time.time() + 3600)
+
+
+@pytest.fixture
+def auth_calls(monkeypatch):
+    """Ganti panggilan ke auth-service; hasil/exception diatur lewat `calls`."""
+    calls = {"count": 0, "result": {"username": "budi"}, "error": None, "delay": 0.01}
+
+    async def fake_verify(token):
+        calls["count"] += 1
+        # Beri kesempatan request lain masuk selama "round-trip"
+        await asyncio.sleep(calls["delay"])
+        if calls["error"] is not None:
+            raise calls["error"]
+        return calls["result"]
+
+    monkeypatch.setattr(main, "_verify_with_auth_service", fake_verify)
+    return calls
+
+
+@pytest.fixture
+def verify_many():
+    def run(token: str, n: int = 1):
+        async def gather():
+            return await asyncio.gather(
+                *(main.verify_token_or_raise(f"Bearer {token}") for _ in range(n)),
+                return_exceptions=True,
+            )
+        return asyncio.run(gather())
+    return run
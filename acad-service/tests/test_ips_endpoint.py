@@ -0,0 +1,186 @@
+import asyncio
+import gc
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+
+
+class FakeConn:
+    stmt_ips = None
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetchrow(self, query, *args):
+        self.pool.calls += 1
+        try:
+            await asyncio.sleep(self.pool.delay)
+        except asyncio.CancelledError:
+            self.pool.cancelled = True
+            raise
+        if self.pool.error is not None:
+            raise self.pool.error
+        return self.pool.row
+
+
+class FakeAcquire:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return FakeConn(self.pool)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakePool:
+    def __init__(self):
+        self.row = {"nim": "22001", "nama": "Ahmad Fauzan", "total_sks": 9, "ips": Decimal("3.50")}
+        self.error = None
+        self.delay = 0
+        self.calls = 0
+        self.cancelled = False
+
+    def acquire(self):
+        return FakeAcquire(self)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(main.app.state, "pool", pool, raising=False)
+    return pool
+
+
+@pytest.fixture
+def client():
+    # Tanpa context manager: event startup (koneksi DB asli) tidak dijalankan
+    return TestClient(main.app)
+
+
+def get_ips(client, token, nim="22001", semester=1):
+    return client.get(
+        f"/api/acad/ips/{nim}",
+        params={"semester": semester},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+def test_ips_ok(client, pool, auth_calls, valid_token):
+    resp = get_ips(client, valid_token)
+
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "nim": "22001",
+        "nama": "Ahmad Fauzan",
+        "semester": 1,
+        "total_sks": 9,
+        "ips": 3.5,
+        "requested_by": "budi",
+    }
+
+
+def test_ips_mahasiswa_not_found_is_cached(client, pool, auth_calls, valid_token):
+    pool.row = None
+
+    first = get_ips(client, valid_token, nim="99999")
+    second = get_ips(client, valid_token, nim="99999")
+
+    assert first.status_code == second.status_code == 404
+    assert second.json()["detail"] == main.MAHASISWA_NOT_FOUND
+    assert pool.calls == 1
+
+
+def test_ips_without_krs(client, pool, auth_calls, valid_token):
+    pool.row = {"nim": "22001", "nama": "Ahmad Fauzan", "total_sks": None, "ips": None}
+
+    resp = get_ips(client, valid_token, semester=5)
+
+    assert resp.status_code == 404
+    assert resp.json()["detail"] == main.KRS_NOT_FOUND
+
+
+def test_ips_db_error(client, pool, auth_calls, valid_token):
+    pool.error = RuntimeError("db down")
+
+    resp = get_ips(client, valid_token)
+
+    assert resp.status_code == 500
+
+
+def test_rejected_token_with_failed_db_task_logs_nothing(client, pool, auth_calls, valid_token, caplog):
+    # Task DB sudah gagal sebelum auth-service menolak token
+    pool.error = RuntimeError("db down")
+    auth_calls["error"] = HTTPException(status_code=401, detail="Token tidak valid")
+    auth_calls["delay"] = 0.05
+
+    resp = get_ips(client, valid_token)
+    gc.collect()
+
+    assert resp.status_code == 401
+    assert pool.calls == 1
+    assert "never retrieved" not in caplog.text
+
+
+def test_rejected_by_auth_service_cancels_db_task(pool, auth_calls, valid_token):
+    pool.delay = 1
+    auth_calls["error"] = HTTPException(status_code=401, detail="Token tidak valid")
+
+    async def run():
+        with pytest.raises(HTTPException) as exc:
+            await main.get_ips("22001", semester=1, authorization=f"Bearer {valid_token}")
+        await asyncio.sleep(0)
+        # Dicek sebelum asyncio.run membatalkan sisa task saat loop ditutup
+        assert pool.cancelled
+        return exc.value
+
+    assert asyncio.run(run()).status_code == 401
+    assert pool.calls == 1
+
+
+def test_malformed_token_never_starts_db_task(client, pool, auth_calls):
+    resp = get_ips(client, "abc")
+
+    assert resp.status_code == 401
+    assert pool.calls == 0
+    assert auth_calls["count"] == 0
+
+
+def test_locally_rejected_token_never_starts_db_task(client, pool, auth_calls, make_token, monkeypatch):
+    monkeypatch.setattr(main, "JWT_SECRET", "secret-lain")
+
+    resp = get_ips(client, make_token(exp=9999999999))
+
+    assert resp.status_code == 401
+    assert pool.calls == 0
+    assert auth_calls["count"] == 0
+
+
+def test_cached_token_skips_auth_service(client, pool, auth_calls, valid_token):
+    get_ips(client, valid_token)
+    resp = get_ips(client, valid_token)
+
+    assert resp.status_code == 200
+    assert auth_calls["count"] == 1
+    assert pool.calls == 2
+
+
+def test_discard_task_result_retrieves_failed_task_exception(caplog):
+    async def boom():
+        raise RuntimeError("db down")
+
+    async def run():
+        task = asyncio.create_task(boom())
+        await asyncio.sleep(0)
+        main._discard_task_result(task)
+        del task
+        gc.collect()
+
+    asyncio.run(run())
+
+    assert "never retrieved" not in caplog.text
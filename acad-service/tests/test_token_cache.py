@@ -0,0 +1,33 @@
+import hashlib
+import time
+
+import main
+
+
+def test_cached_token_skips_auth_service(auth_calls, verify_many, valid_token):
+    verify_many(valid_token)
+    verify_many(valid_token)
+
+    assert auth_calls["count"] == 1
+
+
+def test_cache_expiry_capped_at_token_exp(auth_calls, verify_many, make_token, monkeypatch):
+    now = time.time()
+    token = make_token(exp=now + 5)
+    monkeypatch.setattr(main, "TOKEN_CACHE_TTL", 120)
+
+    verify_many(token)
+    key = hashlib.sha256(token.encode()).hexdigest()
+    _, expires_at = main._token_cache._data[key]
+    assert expires_at <= now + 5
+
+    # Setelah exp token lewat, cache tidak lagi dipakai
+    monkeypatch.setattr(time, "time", lambda: now + 10)
+    verify_many(token)
+    assert auth_calls["count"] == 2
+
+
+def test_expired_token_is_not_cached(auth_calls, verify_many, make_token):
+    verify_many(make_token(exp=time.time() - 1))
+
+    assert len(main._token_cache) == 0
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+
+
+@pytest.mark.parametrize("authorization", [
+    None,
+    "Token abc",
+    "Bearer abc",
+    "Bearer a.b.c",
+    "Bearer " + "x" * 30 + ".payload.signature",
+    "Bearer eyJmb28iOiJiYXIifQ.eyJ1c2VybmFtZSI6ImJ1ZGkifQ.signature",
+])
+def test_malformed_tokens_rejected_before_auth_service(auth_calls, authorization):
+    async def run():
+        await main.verify_token_or_raise(authorization)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(run())
+
+    assert exc.value.status_code == 401
+    assert auth_calls["count"] == 0
+
+
+def test_wellformed_token_passes_prefilter(valid_token):
+    assert main._is_wellformed_jwt(valid_token)
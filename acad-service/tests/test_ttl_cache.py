@@ -0,0 +1,40 @@
+import time
+
+import main
+
+
+def test_not_found_cache_expires(monkeypatch):
+    now = time.time()
+    main._cache_not_found(("22999",), main.MAHASISWA_NOT_FOUND)
+    main._cache_not_found(("22001", 2), main.KRS_NOT_FOUND)
+
+    assert main._get_not_found("22999", 1) == main.MAHASISWA_NOT_FOUND
+    assert main._get_not_found("22001", 2) == main.KRS_NOT_FOUND
+    assert main._get_not_found("22001", 1) is None
+
+    monkeypatch.setattr(time, "time", lambda: now + main.NOT_FOUND_CACHE_TTL + 1)
+    assert main._get_not_found("22999", 1) is None
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = main.TTLCache(maxsize=2)
+    expires_at = time.time() + 60
+    cache.set("a", 1, expires_at)
+    cache.set("b", 2, expires_at)
+    cache.get("a")
+    cache.set("c", 3, expires_at)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_drops_expired_entries(monkeypatch):
+    now = time.time()
+    cache = main.TTLCache(maxsize=10)
+    cache.set("a", 1, now + 5)
+
+    monkeypatch.setattr(time, "time", lambda: now + 6)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
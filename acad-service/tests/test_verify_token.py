@@ -0,0 +1,45 @@
+import asyncio
+
+from fastapi import HTTPException
+
+import main
+
+
+def test_concurrent_callers_share_one_verification(auth_calls, verify_many, valid_token):
+    results = verify_many(valid_token, 20)
+
+    assert auth_calls["count"] == 1
+    assert results == [{"username": "budi"}] * 20
+    assert main._inflight == {}
+
+
+def test_verification_error_propagates_to_all_waiters(auth_calls, verify_many, valid_token):
+    auth_calls["error"] = HTTPException(status_code=401, detail="Token tidak valid")
+
+    results = verify_many(valid_token, 10)
+
+    assert auth_calls["count"] == 1
+    assert all(isinstance(r, HTTPException) and r.status_code == 401 for r in results)
+    assert main._inflight == {}
+    # Kegagalan tidak boleh ikut di-cache
+    assert len(main._token_cache) == 0
+
+
+def test_cancelled_first_caller_does_not_fail_other_waiters(auth_calls, valid_token):
+    auth_calls["delay"] = 0.05
+
+    async def run():
+        leader = asyncio.create_task(main.verify_token_or_raise(f"Bearer {valid_token}"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(main.verify_token_or_raise(f"Bearer {valid_token}"))
+        await asyncio.sleep(0.01)
+        # Client pertama putus di tengah verifikasi
+        leader.cancel()
+        result = await follower
+        assert leader.cancelled()
+        return result
+
+    assert asyncio.run(run()) == {"username": "budi"}
+    assert auth_calls["count"] == 1
+    assert main._inflight == {}
+    assert len(main._token_cache) == 1